@@ -2,6 +2,7 @@ from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from app.routers import ocr_router
+from app.services.worker_metrics import recorder
 import os
 
 # Create FastAPI app
@@ -23,6 +24,36 @@ app.add_middleware(
 # Include routers
 app.include_router(ocr_router.router)
 
+# Per-worker metrics (see /api/metrics)
+@app.on_event("startup")
+async def record_cold_start():
+    recorder.mark_ready()
+
+class RequestCounterMiddleware:
+    """
+    Count responses for the worker metrics
+    
+    Plain ASGI rather than @app.middleware("http"): that wraps `receive`,
+    which hides client disconnects from the OCR endpoint.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        
+        async def send_and_count(message):
+            if message['type'] == 'http.response.start':
+                recorder.record_request()
+            await send(message)
+        
+        await self.app(scope, receive, send_and_count)
+
+app.add_middleware(RequestCounterMiddleware)
+
 # Root endpoint
 @app.get("/")
 async def root():
@@ -41,6 +72,7 @@ async def global_exception_handler(request, exc):
         detail=f"Internal server error: {str(exc)}"
     )
 
+# Development server with auto-reload; for production use `python -m app.serve`
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
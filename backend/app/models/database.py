@@ -1,18 +1,29 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import Column, Integer, String, DateTime, Text, Float
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text, event
 from datetime import datetime
 import os
 
 # Database setup
 DATABASE_URL = "sqlite:///./image_text_history.db"
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Let several worker processes read while one writes"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 class ExtractionHistory(Base):
     __tablename__ = "extraction_history"
+    # Never reuse the id of a deleted row: the near-duplicate index syncs
+    # new rows by id
+    __table_args__ = {'sqlite_autoincrement': True}
     
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String, nullable=False)
@@ -21,10 +32,54 @@ class ExtractionHistory(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     file_size = Column(Integer)
     processing_time = Column(String)
+    confidence = Column(Float)
+    image_hash = Column(String)  # Perceptual hash (hex) for near-duplicate lookup
+    image_detail_hash = Column(Text)  # Finer perceptual hash (hex) confirming a match
+
+class WorkerMetrics(Base):
+    """Per-process serving metrics, shared between workers through the database"""
+    __tablename__ = "worker_metrics"
+    
+    pid = Column(Integer, primary_key=True)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    cold_start_seconds = Column(Float)
+    rss_bytes = Column(Integer)
+    pss_bytes = Column(Integer)
+    requests = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
 
 # Create tables
 Base.metadata.create_all(bind=engine)
 
+def _add_missing_columns():
+    """Add columns introduced after the table was first created"""
+    existing = {column['name'] for column in inspect(engine).get_columns(ExtractionHistory.__tablename__)}
+    with engine.begin() as conn:
+        for column in ExtractionHistory.__table__.columns:
+            if column.name not in existing:
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {ExtractionHistory.__tablename__} ADD COLUMN {column.name} {column_type}"))
+
+def _enable_autoincrement():
+    """Rebuild a history table created before its ids were AUTOINCREMENT"""
+    table = ExtractionHistory.__table__
+    with engine.begin() as conn:
+        sql = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                           {'name': table.name}).scalar()
+        if sql is None or 'AUTOINCREMENT' in sql.upper():
+            return
+        
+        conn.execute(text(f"ALTER TABLE {table.name} RENAME TO {table.name}_old"))
+        for index in table.indexes:
+            conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+        table.create(conn)
+        columns = ', '.join(column.name for column in table.columns)
+        conn.execute(text(f"INSERT INTO {table.name} ({columns}) SELECT {columns} FROM {table.name}_old"))
+        conn.execute(text(f"DROP TABLE {table.name}_old"))
+
+_add_missing_columns()
+_enable_autoincrement()
+
 def get_db():
     db = SessionLocal()
     try:
@@ -1,24 +1,149 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Response
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Response, Request, Query
 from sqlalchemy.orm import Session
-from app.models.database import get_db, ExtractionHistory
+from app.models.database import get_db, ExtractionHistory, WorkerMetrics
 from app.services.ocr_service import OCRService
+from app.services.image_hash import PerceptualHashIndex, hamming_distance
+from app.services.deadline import Deadline
+from app.services.worker_metrics import recorder
 from typing import List, Optional
+import asyncio
+import functools
 import io
+import os
+import time
 from datetime import datetime
 
 router = APIRouter(prefix="/api", tags=["ocr"])
 ocr_service = OCRService()
 
+# Near-duplicate detection: uploads whose perceptual hash is within this many
+# bits of an earlier extraction are candidates for reusing its result. Set to
+# -1 to disable.
+DUPLICATE_MAX_DISTANCE = int(os.getenv("OCR_DUPLICATE_MAX_DISTANCE", "6"))
+# A candidate is only reused when its detail hash (4096 bits) is this close
+DUPLICATE_MAX_DETAIL_DISTANCE = int(os.getenv("OCR_DUPLICATE_MAX_DETAIL_DISTANCE", "64"))
+# Closest candidates checked against the detail hash per upload
+DUPLICATE_MAX_CANDIDATES = 32
+duplicate_index = PerceptualHashIndex(DUPLICATE_MAX_DISTANCE) if DUPLICATE_MAX_DISTANCE >= 0 else None
+
+def _sync_duplicate_index(db: Session):
+    """Load history rows added since the last sync (possibly by other workers)"""
+    rows = db.query(ExtractionHistory.id, ExtractionHistory.image_hash, ExtractionHistory.language)\
+             .filter(ExtractionHistory.id > duplicate_index.last_id, ExtractionHistory.image_hash.isnot(None))\
+             .all()
+    for item_id, image_hash, item_language in rows:
+        duplicate_index.add(int(image_hash, 16), item_id, item_language)
+
+def preload_duplicate_index(db: Session):
+    """Load the whole history into the near-duplicate index up front"""
+    if duplicate_index is not None:
+        _sync_duplicate_index(db)
+
+def _find_duplicate(db: Session, image_hashes: Optional[tuple], language: str) -> Optional[ExtractionHistory]:
+    """Return an earlier extraction of a near-identical image, if any"""
+    if duplicate_index is None or image_hashes is None:
+        return None
+
+    image_hash, detail_hash = image_hashes
+    _sync_duplicate_index(db)
+    candidate_ids = [item_id for item_id, _ in duplicate_index.find(int(image_hash, 16), language)]
+    candidate_ids = candidate_ids[:DUPLICATE_MAX_CANDIDATES]
+    if not candidate_ids:
+        return None
+
+    items = {item.id: item for item in db.query(ExtractionHistory).filter(ExtractionHistory.id.in_(candidate_ids))}
+    for item_id in candidate_ids:
+        item = items.get(item_id)
+        if item is None:
+            # Deleted since it was indexed (possibly by another worker)
+            duplicate_index.remove(item_id)
+            continue
+        if item.image_detail_hash and \
+                hamming_distance(int(detail_hash, 16), int(item.image_detail_hash, 16)) <= DUPLICATE_MAX_DETAIL_DISTANCE:
+            return item
+    return None
+
+def _is_reusable(ocr_result: dict) -> bool:
+    """Whether a result was read by a real engine, so near-duplicates may reuse it"""
+    engine_name = ocr_result.get('engine')
+    if engine_name == 'cache':
+        # Reused from an earlier real extraction
+        return True
+    engine = ocr_service.registry.get(engine_name) if engine_name else None
+    return engine is not None and not engine.fallback_only
+
+def _extract_or_reuse(db: Session, file_content: bytes, language: str, reuse_duplicates: bool,
+                      auto_detect: bool, deadline: Deadline) -> tuple:
+    """
+    Blocking part of /extract-text: reuse a near-duplicate's result or run OCR
+    
+    Images are only hashed when reuse was requested.
+    
+    Returns:
+        tuple: OCR result and the image hashes (None without reuse)
+    """
+    start_time = time.time()
+    image_hashes = None
+    if reuse_duplicates and duplicate_index is not None:
+        image_hashes = ocr_service.compute_image_hashes(file_content)
+        duplicate = _find_duplicate(db, image_hashes, language)
+        if duplicate is not None:
+            return {
+                'text': duplicate.extracted_text,
+                'confidence': duplicate.confidence or 0,
+                'processing_time': f"{time.time() - start_time:.2f}s",
+                'engine': 'cache',
+                'language_used': duplicate.language,
+                'duplicate_of': duplicate.id,
+                'success': True
+            }, image_hashes
+    
+    result = ocr_service.extract_text_from_image(file_content, language, auto_detect=auto_detect, deadline=deadline)
+    return result, image_hashes
+
+# Seconds between checks for a disconnected client while OCR runs
+DISCONNECT_POLL_INTERVAL = 0.5
+
+async def _run_until_disconnect(request: Request, deadline: Deadline, work):
+    """
+    Run blocking OCR work off the event loop, cancelling it if the client goes away
+    
+    Cancelling the deadline makes the engines kill their subprocesses and
+    return, so the worker thread is free again almost immediately.
+    """
+    future = asyncio.get_running_loop().run_in_executor(None, work)
+    while True:
+        done, _ = await asyncio.wait({future}, timeout=DISCONNECT_POLL_INTERVAL)
+        if done:
+            return future.result()
+        if await request.is_disconnected():
+            deadline.cancel()
+            return await future
+
 @router.post("/extract-text")
 async def extract_text(
+    request: Request,
     file: UploadFile = File(...),
     language: str = "eng",
+    reuse_duplicates: bool = False,
+    auto_detect: bool = False,
+    timeout: Optional[float] = Query(None, gt=0, description="Seconds before OCR is abandoned (default OCR_REQUEST_TIMEOUT)"),
     db: Session = Depends(get_db)
 ):
     """
     Extract text from uploaded image using OCR
+    
+    With reuse_duplicates, near-duplicates of an earlier upload (same
+    document re-encoded or re-captured) reuse the earlier result. Perceptual
+    hashes cannot tell apart pages that differ in a few characters, so this
+    is off by default.
+    With auto_detect, rotated pages are straightened and a multi-language
+    request (e.g. eng+hin) runs only the model matching the detected script.
+    OCR stops when the timeout passes (504) or the client disconnects.
     """
     try:
+        deadline = Deadline(timeout)
+        
         # Read file content
         file_content = await file.read()
         
@@ -27,19 +152,33 @@ async def extract_text(
         if not validation_result['valid']:
             raise HTTPException(status_code=400, detail=validation_result['message'])
         
-        # Extract text using OCR
-        ocr_result = ocr_service.extract_text_from_image(file_content, language)
+        # Duplicate lookup and OCR, off the event loop
+        ocr_result, image_hashes = await _run_until_disconnect(request, deadline, functools.partial(
+            _extract_or_reuse, db, file_content, language,
+            reuse_duplicates=reuse_duplicates, auto_detect=auto_detect, deadline=deadline
+        ))
         
+        if ocr_result.get('cancelled'):
+            # Client is gone; the status code is only for the access log
+            raise HTTPException(status_code=499, detail="Client closed request")
+        if ocr_result.get('timed_out'):
+            raise HTTPException(status_code=504, detail=f"OCR processing timed out: {ocr_result['error']}")
         if not ocr_result['success']:
             raise HTTPException(status_code=500, detail=f"OCR processing failed: {ocr_result.get('error', 'Unknown error')}")
         
-        # Save to database
+        # Save to database; only results from a real engine are hashed, so
+        # demo text is never served to later near-duplicates
+        if not _is_reusable(ocr_result):
+            image_hashes = None
         history_entry = ExtractionHistory(
             filename=file.filename,
             extracted_text=ocr_result['text'],
             language=language,
             file_size=len(file_content),
-            processing_time=ocr_result['processing_time']
+            processing_time=ocr_result['processing_time'],
+            confidence=ocr_result['confidence'],
+            image_hash=image_hashes[0] if image_hashes else None,
+            image_detail_hash=image_hashes[1] if image_hashes else None
         )
         db.add(history_entry)
         db.commit()
@@ -52,8 +191,13 @@ async def extract_text(
             "confidence": ocr_result['confidence'],
             "processing_time": ocr_result['processing_time'],
             "language": language,
+            "engine": ocr_result.get('engine'),
+            "language_used": ocr_result.get('language_used', language),
+            "rotation": ocr_result.get('rotation', 0),
+            "blank": ocr_result.get('blank', False),
             "file_size": len(file_content),
             "created_at": history_entry.created_at.isoformat(),
+            "duplicate_of": ocr_result.get('duplicate_of'),
             "success": True
         }
         
@@ -121,6 +265,9 @@ async def delete_history_item(
         db.delete(item)
         db.commit()
         
+        if duplicate_index is not None:
+            duplicate_index.remove(item_id)
+        
         return {"message": "History item deleted successfully"}
         
     except HTTPException:
@@ -170,6 +317,38 @@ async def get_supported_languages():
     """
     return ocr_service.get_supported_languages()
 
+@router.get("/engines")
+async def get_engines():
+    """
+    Get registered OCR engines with their capabilities, health and load
+    """
+    return ocr_service.get_engine_info()
+
+@router.get("/metrics")
+async def get_metrics(db: Session = Depends(get_db)):
+    """
+    Get per-worker serving metrics (cold start, memory, requests)
+    """
+    recorder.flush()
+    workers = db.query(WorkerMetrics).order_by(WorkerMetrics.pid).all()
+    
+    return {
+        "workers": [
+            {
+                "pid": worker.pid,
+                "started_at": worker.started_at.isoformat(),
+                "cold_start_seconds": worker.cold_start_seconds,
+                "rss_bytes": worker.rss_bytes,
+                "pss_bytes": worker.pss_bytes,
+                "requests": worker.requests,
+                "updated_at": worker.updated_at.isoformat()
+            }
+            for worker in workers
+        ],
+        "total_requests": sum(worker.requests or 0 for worker in workers),
+        "total_pss_bytes": sum(worker.pss_bytes or 0 for worker in workers)
+    }
+
 @router.get("/health")
 async def health_check():
     """
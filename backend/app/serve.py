@@ -0,0 +1,184 @@
+"""
+Production server: pre-forking master with warm OCR engines
+
+    python -m app.serve
+
+The master imports the application, which loads every OCR engine (EasyOCR
+models included), then forks the workers. Workers share the loaded model
+memory copy-on-write instead of each loading their own copy, and start
+serving in milliseconds. All workers accept on one listening socket; the
+master restarts any worker that dies.
+
+Workers share results and metrics through the application database: the
+near-duplicate index syncs from the extraction history, and each worker
+keeps its cold-start time, RSS/PSS and request count in worker_metrics
+(see GET /api/metrics).
+
+Environment:
+    HOST, PORT          Listen address (default 0.0.0.0:8000)
+    WEB_CONCURRENCY     Worker count (default: available CPU cores)
+    LOG_LEVEL           Uvicorn log level (default info)
+"""
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+from app.services.cpu_budget import available_cores
+
+# Seconds to wait for workers to finish in-flight requests on shutdown
+GRACEFUL_TIMEOUT = 30
+# Workers dying sooner than this after spawning are restarted with a delay
+MIN_WORKER_LIFETIME = 1.0
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ':' in host else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+class PreforkServer:
+    def __init__(self, host: str, port: int, workers: int, log_level: str = 'info'):
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.log_level = log_level
+        self.children = {}
+        self.stopping = False
+
+    def _load_app(self):
+        """Import the application (and its OCR engines) once, in the master"""
+        started = time.monotonic()
+        from app.main import app
+        from app.models.database import engine, WorkerMetrics, SessionLocal
+        from app.routers.ocr_router import preload_duplicate_index
+        from app.services.worker_metrics import forget_worker
+
+        db = SessionLocal()
+        try:
+            # Build the near-duplicate index before forking so workers
+            # share it instead of each reading the whole history
+            preload_duplicate_index(db)
+            # Rows left behind by a previous run
+            db.query(WorkerMetrics).delete()
+            db.commit()
+        finally:
+            db.close()
+        # Connections must not be shared across fork
+        engine.dispose()
+
+        self.app = app
+        self.db_engine = engine
+        self.forget_worker = forget_worker
+        print(f"Loaded application and OCR engines in {time.monotonic() - started:.2f}s")
+
+    def _spawn(self):
+        pid = os.fork()
+        if pid:
+            self.children[pid] = time.monotonic()
+            return
+
+        # Worker
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, signal.SIG_DFL)
+        self.db_engine.dispose(close=False)
+        config = uvicorn.Config(self.app, log_level=self.log_level, access_log=False)
+        server = uvicorn.Server(config)
+        try:
+            server.run(sockets=[self.sock])
+        finally:
+            os._exit(0)
+
+    def _handle_stop(self, signum, frame):
+        self.stopping = True
+
+    def run(self):
+        self._load_app()
+        self.sock = _bind(self.host, self.port)
+
+        # Move everything loaded so far out of the collector's reach, so
+        # garbage collection in the workers does not touch (and copy) the
+        # shared pages
+        gc.collect()
+        gc.freeze()
+
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGTERM, self._handle_stop)
+
+        print(f"Serving on http://{self.host}:{self.port} with {self.workers} workers (master pid {os.getpid()})")
+        for _ in range(self.workers):
+            self._spawn()
+
+        while not self.stopping:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                pid = 0
+            if pid:
+                spawned_at = self.children.pop(pid, time.monotonic())
+                self.forget_worker(pid)
+                if not self.stopping:
+                    print(f"Worker {pid} exited with status {status}, restarting")
+                    if time.monotonic() - spawned_at < MIN_WORKER_LIFETIME:
+                        # Avoid a tight crash loop
+                        time.sleep(MIN_WORKER_LIFETIME)
+                    self._spawn()
+                continue
+            time.sleep(0.5)
+
+        self._shutdown()
+
+    def _shutdown(self):
+        for pid in self.children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+        deadline = time.monotonic() + GRACEFUL_TIMEOUT
+        while self.children and time.monotonic() < deadline:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid:
+                self.children.pop(pid, None)
+                self.forget_worker(pid)
+            else:
+                time.sleep(0.1)
+
+        for pid in self.children:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        self.sock.close()
+
+
+def main():
+    if not hasattr(os, 'fork'):
+        sys.exit("Pre-fork serving needs os.fork(); use 'uvicorn app.main:app' on this platform")
+
+    workers = int(os.getenv("WEB_CONCURRENCY", "0")) or available_cores()
+    # The OCR engines size their concurrency from each worker's share of
+    # the cores, so they must know the worker count before the app loads
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    server = PreforkServer(
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8000")),
+        workers=workers,
+        log_level=os.getenv("LOG_LEVEL", "info")
+    )
+    server.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+CPU budget of this process
+
+The production server runs one worker per core, and every worker runs its
+own OCR engines. Engines size their concurrency from this worker's share of
+the cores, so that workers times engine threads does not oversubscribe the
+machine.
+"""
+import math
+import os
+
+
+def available_cores() -> int:
+    """CPU cores this process may use, honouring affinity and cgroup quotas"""
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+
+    # Containers limited with --cpus report all host cores above
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as cpu_max:
+            quota, period = cpu_max.read().split()
+        if quota != 'max':
+            cores = min(cores, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cores
+
+
+def worker_count() -> int:
+    """
+    Server processes sharing the cores
+
+    Read from WEB_CONCURRENCY, which app.serve sets to its worker count and
+    uvicorn --workers defaults to; a single process otherwise.
+    """
+    try:
+        return max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+    except ValueError:
+        return 1
+
+
+def cores_per_worker() -> int:
+    """This worker's share of the available cores"""
+    return max(1, available_cores() // worker_count())
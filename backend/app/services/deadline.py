@@ -0,0 +1,75 @@
+"""
+Per-request deadlines and cancellation
+
+A Deadline is created when a request arrives and handed down through
+preprocessing and recognition. Long-running steps check it between stages
+and engines poll it while their work runs, so OCR stops as soon as the time
+budget is spent or the request is cancelled (e.g. the client disconnected),
+instead of finishing a result nobody will read.
+"""
+import os
+import threading
+import time
+from typing import Optional
+
+# Seconds a request may spend in preprocessing and recognition
+DEFAULT_REQUEST_TIMEOUT = float(os.getenv("OCR_REQUEST_TIMEOUT", "120"))
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request runs out of time"""
+
+
+class RequestCancelled(DeadlineExceeded):
+    """Raised when a request was cancelled before it finished"""
+
+
+class Deadline:
+    """
+    Point in time by which a request must finish, plus a cancel flag
+
+    Child deadlines (e.g. one engine attempt) expire no later than their
+    parent and are cancelled along with it.
+    """
+
+    def __init__(self, timeout: Optional[float] = None, parent: Optional['Deadline'] = None):
+        timeout = DEFAULT_REQUEST_TIMEOUT if timeout is None else timeout
+        self.expires_at = time.monotonic() + timeout
+        self.parent = parent
+        if parent is not None:
+            self.expires_at = min(self.expires_at, parent.expires_at)
+        self._cancelled = threading.Event()
+
+    def child(self, timeout: float) -> 'Deadline':
+        """Deadline for a sub-task that may not outlive this one"""
+        return Deadline(timeout, parent=self)
+
+    def cancel(self):
+        """Ask everything working under this deadline to stop"""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set() or (self.parent is not None and self.parent.cancelled)
+
+    def remaining(self) -> float:
+        """Seconds left, never negative"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        """True once the time is up or the deadline was cancelled"""
+        return self.cancelled or self.remaining() <= 0
+
+    def check(self):
+        """
+        Raise if work under this deadline should stop
+
+        Raises:
+            RequestCancelled: If the deadline (or a parent) was cancelled
+            DeadlineExceeded: If the time is up
+        """
+        if self.cancelled:
+            raise RequestCancelled("Request was cancelled")
+        if self.remaining() <= 0:
+            raise DeadlineExceeded("Request deadline exceeded")
@@ -0,0 +1,543 @@
+"""
+OCR engine registry and router
+
+Every recognition backend implements the same small interface: what it can
+read (capabilities), roughly how long a page will take (cost estimate) and
+whether it is usable right now (health). The router ranks the healthy
+engines for each request by estimated cost scaled by their current load,
+and falls back to the next engine when one fails or times out. Fallback-only
+engines (demo) are never a fallback for a real engine: they answer only
+when no real engine is registered and healthy.
+
+Which engines exist, and in which order of preference, is configuration
+(``OCR_ENGINES``), so the full server and the serverless app share this
+code and only differ in what is installed.
+
+Engines receive the request's Deadline and stop when it expires or is
+cancelled: Tesseract subprocesses are killed, and EasyOCR checks between
+detection and each recognition batch.
+"""
+import abc
+import csv
+import importlib.util
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional
+
+from PIL import Image
+
+from app.services.cpu_budget import cores_per_worker
+from app.services.deadline import Deadline, DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+# EasyOCR pulls in torch, so it is only imported when its engine is created
+EASYOCR_AVAILABLE = importlib.util.find_spec('easyocr') is not None
+
+# Self-contained Tesseract shipped with the app (see bundle_tesseract.sh):
+# bin/tesseract, lib/ with its shared libraries, tessdata/ with the models
+TESSERACT_BUNDLE = os.getenv(
+    "TESSERACT_BUNDLE",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'tesseract')
+)
+
+# Engines to register, in order of preference
+DEFAULT_ENGINES = "tesseract,easyocr,demo"
+# Seconds an engine may take on one page before the next one is tried
+DEFAULT_ENGINE_TIMEOUT = float(os.getenv("OCR_ENGINE_TIMEOUT", "60"))
+# Seconds a health check result is reused
+HEALTH_TTL = 30.0
+# Seconds between deadline checks while an engine runs
+POLL_INTERVAL = 0.05
+# Text boxes EasyOCR recognises between deadline checks
+EASYOCR_BATCH = 16
+# Tesseract OSD output line -> result key and type
+OSD_FIELDS = {
+    'Rotate': ('rotate', int),
+    'Orientation confidence': ('orientation_conf', float),
+    'Script': ('script', str),
+    'Script confidence': ('script_conf', float)
+}
+
+
+class EngineError(Exception):
+    """Raised when an engine cannot produce a result"""
+
+
+class OCREngine(abc.ABC):
+    """
+    Base class for OCR engines
+
+    Subclasses set the class attributes and implement ``recognize``.
+    """
+
+    name = 'base'
+    # Language codes (as used in OCRService.supported_languages) the engine reads
+    languages = frozenset()
+    # Rough CPU seconds per language model: a fixed start-up (process
+    # start, model load) plus a share per megapixel
+    startup_seconds = 0.0
+    seconds_per_megapixel = 1.0
+    # Requests the engine can run in parallel without slowing each other down
+    capacity = 1
+    # Only used when no regular engine is registered and healthy
+    fallback_only = False
+
+    def __init__(self):
+        self.in_flight = 0
+        self.completed = 0
+        self.failures = 0
+        self._healthy = None
+        self._health_checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def supports(self, language: str) -> bool:
+        """Whether every model in a combined code like 'eng+hin' is available"""
+        return all(code in self.languages for code in language.split('+'))
+
+    def estimate_cost(self, width: int, height: int, language: str) -> float:
+        """
+        Estimated seconds to recognise a page of this size
+
+        The fixed start-up dominates small images and the per-megapixel
+        share large ones, so an engine that is slow to start but fast per
+        pixel wins only above some image size.
+        """
+        megapixels = width * height / 1_000_000
+        return (self.startup_seconds + megapixels * self.seconds_per_megapixel) * len(language.split('+'))
+
+    def load_factor(self) -> float:
+        """Multiplier applied to the cost estimate for the current load"""
+        return 1.0 + self.in_flight / self.capacity
+
+    def is_healthy(self) -> bool:
+        """Cached result of ``check_health``"""
+        now = time.monotonic()
+        if self._healthy is None or now - self._health_checked_at > HEALTH_TTL:
+            try:
+                self._healthy = self.check_health()
+            except Exception:
+                self._healthy = False
+            self._health_checked_at = now
+        return self._healthy
+
+    def check_health(self) -> bool:
+        """Verify the engine can run; override in subclasses"""
+        return True
+
+    @abc.abstractmethod
+    def recognize(self, image: Image.Image, language: str, deadline: Deadline) -> dict:
+        """
+        Recognise text in an RGB image
+
+        Implementations must stop promptly once the deadline expires.
+
+        Returns:
+            dict: 'text' and 'confidence' (0-100)
+
+        Raises:
+            DeadlineExceeded: If the deadline expired or was cancelled
+        """
+
+    def info(self) -> dict:
+        """Capabilities, health and load, for diagnostics"""
+        return {
+            'name': self.name,
+            'languages': sorted(self.languages),
+            'healthy': self.is_healthy(),
+            'fallback_only': self.fallback_only,
+            'in_flight': self.in_flight,
+            'capacity': self.capacity,
+            'completed': self.completed,
+            'failures': self.failures
+        }
+
+
+class TesseractEngine(OCREngine):
+    """Tesseract binary; one subprocess per page, killed on deadline expiry"""
+
+    name = 'tesseract'
+    # Set from the installed models when the engine is created
+    languages = frozenset()
+    # A new process that loads each traineddata file on every page
+    startup_seconds = 0.25
+    seconds_per_megapixel = 0.6
+
+    def __init__(self):
+        super().__init__()
+        # One single-threaded subprocess per core of this worker's share
+        self.capacity = cores_per_worker()
+        # The binary is run directly, so no Python wrapper is needed
+        self.tesseract_cmd = None
+
+        bundled = os.path.join(TESSERACT_BUNDLE, 'bin', 'tesseract')
+        if os.access(bundled, os.X_OK):
+            self._use_bundle(bundled)
+            return
+
+        # Configure tesseract path if needed
+        # For macOS with Homebrew
+        tesseract_path = shutil.which('tesseract')
+        if tesseract_path:
+            self.tesseract_cmd = tesseract_path
+        elif os.path.exists('/opt/homebrew/bin/tesseract'):
+            self.tesseract_cmd = '/opt/homebrew/bin/tesseract'
+        elif os.path.exists('/usr/local/bin/tesseract'):
+            self.tesseract_cmd = '/usr/local/bin/tesseract'
+        # For Windows (uncomment if needed)
+        # self.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+
+        if self.tesseract_cmd:
+            self.languages = self._installed_languages()
+
+    def _installed_languages(self) -> frozenset:
+        """Models the Tesseract install can load, e.g. only eng without tesseract-ocr-hin"""
+        try:
+            result = subprocess.run([self.tesseract_cmd, '--list-langs'], stdout=subprocess.PIPE,
+                                    stderr=subprocess.STDOUT, timeout=10, text=True)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logger.warning("Could not list Tesseract languages: %s", e)
+            return frozenset()
+        # The first line is a "List of available languages ..." header
+        return frozenset(
+            line.strip() for line in result.stdout.splitlines()[1:]
+            if line.strip() and line.strip() != 'osd'
+        )
+
+    def _use_bundle(self, tesseract_cmd: str):
+        """Point the engine and the subprocess environment at the bundled Tesseract"""
+        self.tesseract_cmd = tesseract_cmd
+
+        library_dir = os.path.join(TESSERACT_BUNDLE, 'lib')
+        if os.path.isdir(library_dir):
+            os.environ['LD_LIBRARY_PATH'] = os.pathsep.join(
+                path for path in (library_dir, os.environ.get('LD_LIBRARY_PATH')) if path
+            )
+
+        tessdata_dir = os.path.join(TESSERACT_BUNDLE, 'tessdata')
+        if os.path.isdir(tessdata_dir):
+            os.environ.setdefault('TESSDATA_PREFIX', tessdata_dir)
+            # A trimmed bundle may ship only some models; only claim those
+            self.languages = frozenset(
+                filename[:-len('.traineddata')] for filename in os.listdir(tessdata_dir)
+                if filename.endswith('.traineddata') and filename != 'osd.traineddata'
+            )
+
+    def check_health(self) -> bool:
+        if self.tesseract_cmd is None:
+            raise EngineError("tesseract binary not found")
+        subprocess.run([self.tesseract_cmd, '--version'], stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL, timeout=10, check=True)
+        return True
+
+    def detect_orientation_and_script(self, image: Image.Image, deadline: Deadline) -> dict:
+        """
+        Raw Tesseract OSD result for an image
+
+        Runs like recognition, so OSD is killed as soon as the deadline
+        expires or the request is cancelled.
+
+        Returns:
+            dict: 'rotate', 'orientation_conf', 'script' and 'script_conf'
+        """
+        output = self._run_tesseract(image, ['--psm', '0', '-l', 'osd'], ['osd'], deadline)['osd']
+
+        osd = {}
+        for line in output.splitlines():
+            key, _, value = line.partition(':')
+            if key in OSD_FIELDS:
+                field, parse = OSD_FIELDS[key]
+                osd[field] = parse(value.strip())
+        return osd
+
+    def _run_tesseract(self, image: Image.Image, args: List[str], outputs: List[str], deadline: Deadline) -> Dict[str, str]:
+        """
+        Run the tesseract binary, killing it if the deadline expires
+
+        Returns:
+            dict: Output extension -> file contents
+        """
+        with tempfile.TemporaryDirectory(prefix='ocr-') as workdir:
+            input_path = os.path.join(workdir, 'input.png')
+            output_base = os.path.join(workdir, 'output')
+            image.save(input_path, compress_level=1)
+            deadline.check()
+
+            with open(os.path.join(workdir, 'stderr'), 'w+') as stderr:
+                # txt/tsv are config files switching those outputs on; page
+                # segmentation mode 0 always writes the .osd file
+                configs = [extension for extension in outputs if extension != 'osd']
+                process = subprocess.Popen(
+                    [self.tesseract_cmd, input_path, output_base, *args, *configs],
+                    stdout=subprocess.DEVNULL,
+                    stderr=stderr
+                )
+                while True:
+                    try:
+                        process.wait(timeout=POLL_INTERVAL)
+                        break
+                    except subprocess.TimeoutExpired:
+                        if deadline.expired:
+                            process.kill()
+                            process.wait()
+                            deadline.check()
+
+                if process.returncode != 0:
+                    stderr.seek(0)
+                    raise EngineError(f"tesseract exited with {process.returncode}: {stderr.read().strip()}")
+
+            results = {}
+            for extension in outputs:
+                with open(f"{output_base}.{extension}", encoding='utf-8') as output:
+                    results[extension] = output.read()
+            return results
+
+    def recognize(self, image: Image.Image, language: str, deadline: Deadline) -> dict:
+        # One run produces both the text and the per-word confidences
+        outputs = self._run_tesseract(image, ['--oem', '3', '--psm', '6', '-l', language], ['txt', 'tsv'], deadline)
+
+        confidences = []
+        for row in csv.DictReader(outputs['tsv'].splitlines(), delimiter='\t', quoting=csv.QUOTE_NONE):
+            try:
+                confidence = float(row['conf'])
+            except (TypeError, ValueError):
+                continue
+            if confidence > 0:
+                confidences.append(confidence)
+        avg_confidence = sum(confidences) / len(confidences) if confidences else 0
+
+        return {'text': outputs['txt'].strip(), 'confidence': avg_confidence}
+
+
+class EasyOCREngine(OCREngine):
+    """EasyOCR with English and Hindi models loaded up front"""
+
+    name = 'easyocr'
+    languages = frozenset({'eng', 'hin'})
+    # Models stay loaded in memory, but recognition on CPU is slow
+    startup_seconds = 0.02
+    seconds_per_megapixel = 3.0
+    # Torch already spreads one page over every core
+    capacity = 1
+
+    def __init__(self):
+        super().__init__()
+        self.reader = None
+        if EASYOCR_AVAILABLE:
+            try:
+                import easyocr
+                # Initialize EasyOCR with English and Hindi support
+                self.reader = easyocr.Reader(['en', 'hi'], gpu=False)
+                print("✅ EasyOCR initialized successfully!")
+            except Exception as e:
+                print(f"⚠️  EasyOCR initialization failed: {e}")
+
+    def estimate_cost(self, width: int, height: int, language: str) -> float:
+        # Both models always run together, whatever was requested
+        return self.startup_seconds + width * height / 1_000_000 * self.seconds_per_megapixel
+
+    def check_health(self) -> bool:
+        return self.reader is not None
+
+    def recognize(self, image: Image.Image, language: str, deadline: Deadline) -> dict:
+        # Convert PIL image to numpy array for EasyOCR
+        import numpy as np
+        from easyocr.utils import reformat_input
+        image_array, image_grey = reformat_input(np.array(image))
+
+        # Same steps as Reader.readtext, split up so the deadline can be
+        # checked between detection and each batch of text boxes
+        deadline.check()
+        horizontal_list, free_list = self.reader.detect(image_array)
+        horizontal_list, free_list = horizontal_list[0], free_list[0]
+
+        results = []
+        for start in range(0, len(horizontal_list), EASYOCR_BATCH):
+            deadline.check()
+            results += self.reader.recognize(image_grey, horizontal_list[start:start + EASYOCR_BATCH], [], detail=1)
+        for start in range(0, len(free_list), EASYOCR_BATCH):
+            deadline.check()
+            results += self.reader.recognize(image_grey, [], free_list[start:start + EASYOCR_BATCH], detail=1)
+
+        # Extract text and confidence
+        extracted_texts = []
+        confidences = []
+
+        for (bbox, text, confidence) in results:
+            if confidence > 0.3:  # Filter low confidence results
+                extracted_texts.append(text)
+                confidences.append(confidence * 100)  # Convert to percentage
+
+        # Combine all text
+        full_text = '\n'.join(extracted_texts)
+        avg_confidence = sum(confidences) / len(confidences) if confidences else 0
+
+        return {'text': full_text.strip(), 'confidence': avg_confidence}
+
+
+class DemoEngine(OCREngine):
+    """Canned text, so the rest of the application works without OCR installed"""
+
+    name = 'demo'
+    languages = frozenset({'eng', 'hin'})
+    seconds_per_megapixel = 0.0
+    capacity = 1000
+    fallback_only = True
+
+    def recognize(self, image: Image.Image, language: str, deadline: Deadline) -> dict:
+        width, height = image.size
+        text = (
+            f'DEMO MODE - OCR not available\n\n'
+            f'This is a sample text extraction to demonstrate the application functionality.\n\n'
+            f'Language: {language}\nImage size: {width} × {height} pixels\n\n'
+            f'To enable real OCR, install either:\n'
+            f'• Tesseract: brew install tesseract tesseract-lang\n'
+            f'• EasyOCR: pip install easyocr\n\n'
+            f'The application interface, history, download, and all other features are working perfectly!'
+        )
+        return {'text': text, 'confidence': 85.5}
+
+
+# Engine name -> class, for OCR_ENGINES
+ENGINE_CLASSES = {
+    TesseractEngine.name: TesseractEngine,
+    EasyOCREngine.name: EasyOCREngine,
+    DemoEngine.name: DemoEngine
+}
+
+
+class EngineRegistry:
+    """Named OCR engines, in order of preference"""
+
+    def __init__(self):
+        self._engines: Dict[str, OCREngine] = {}
+
+    @classmethod
+    def from_config(cls, names: Optional[str] = None) -> 'EngineRegistry':
+        """
+        Build a registry from a comma-separated list of engine names
+
+        Defaults to the OCR_ENGINES environment variable.
+        """
+        names = names or os.getenv("OCR_ENGINES", DEFAULT_ENGINES)
+        registry = cls()
+        for name in (name.strip() for name in names.split(',')):
+            if not name:
+                continue
+            if name not in ENGINE_CLASSES:
+                raise ValueError(f"Unknown OCR engine '{name}'. Available: {', '.join(ENGINE_CLASSES)}")
+            registry.register(ENGINE_CLASSES[name]())
+        return registry
+
+    def register(self, engine: OCREngine):
+        self._engines[engine.name] = engine
+
+    def get(self, name: str) -> Optional[OCREngine]:
+        return self._engines.get(name)
+
+    def engines(self) -> List[OCREngine]:
+        return list(self._engines.values())
+
+
+class EngineRouter:
+    """
+    Pick an engine per request and fall back on failure
+
+    Recognition runs on a shared thread pool. An engine attempt gets its
+    own child deadline; when it times out the attempt is cancelled, so the
+    engine stops and its pool thread is free again, and the next candidate
+    is tried with whatever time the request has left.
+    """
+
+    def __init__(self, registry: EngineRegistry, timeout: float = DEFAULT_ENGINE_TIMEOUT,
+                 max_workers: Optional[int] = None):
+        self.registry = registry
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or cores_per_worker() + 1,
+                                           thread_name_prefix='ocr-engine')
+
+    def healthy_engines(self) -> List[OCREngine]:
+        """
+        Engines requests may be routed to, in order of preference
+
+        Fallback-only engines are left out as soon as any regular engine is
+        healthy, so a real engine's failure (or a language it lacks) is
+        reported instead of being answered with canned text.
+        """
+        healthy = [engine for engine in self.registry.engines() if engine.is_healthy()]
+        if any(not engine.fallback_only for engine in healthy):
+            healthy = [engine for engine in healthy if not engine.fallback_only]
+        return healthy
+
+    def supports(self, language: str) -> bool:
+        """Whether any engine requests may be routed to reads the language"""
+        return any(engine.supports(language) for engine in self.healthy_engines())
+
+    def candidates(self, width: int, height: int, language: str) -> List[OCREngine]:
+        """Healthy engines for this request, cheapest (under current load) first"""
+        preference = {engine.name: index for index, engine in enumerate(self.registry.engines())}
+        usable = [engine for engine in self.healthy_engines() if engine.supports(language)]
+
+        def rank(engine: OCREngine):
+            cost = engine.estimate_cost(width, height, language) * engine.load_factor()
+            return (cost, preference[engine.name])
+
+        return sorted(usable, key=rank)
+
+    def _run(self, engine: OCREngine, image: Image.Image, language: str, deadline: Deadline) -> dict:
+        try:
+            return engine.recognize(image, language, deadline)
+        finally:
+            with engine._lock:
+                engine.in_flight -= 1
+
+    def recognize(self, image: Image.Image, language: str, deadline: Deadline) -> dict:
+        """
+        Recognise an image with the best available engine
+
+        Returns:
+            dict: Engine result plus the 'engine' name that produced it
+
+        Raises:
+            EngineError: If no engine is available or every candidate failed
+            DeadlineExceeded: If the request deadline expired or was cancelled
+        """
+        candidates = self.candidates(image.width, image.height, language)
+        if not candidates:
+            raise EngineError(f"No healthy OCR engine supports language '{language}'")
+
+        errors = []
+        for engine in candidates:
+            deadline.check()
+            attempt = deadline.child(self.timeout)
+            with engine._lock:
+                engine.in_flight += 1
+            future = self.executor.submit(self._run, engine, image, language, attempt)
+            try:
+                # The engine watches the attempt deadline itself; the extra
+                # second only guards against one that does not
+                result = future.result(timeout=attempt.remaining() + 1.0)
+            except (FutureTimeoutError, DeadlineExceeded):
+                attempt.cancel()
+                deadline.check()
+                engine.failures += 1
+                errors.append(f"{engine.name}: timed out after {self.timeout:.0f}s")
+                logger.warning("OCR engine %s timed out, trying next engine", engine.name)
+                continue
+            except Exception as e:
+                engine.failures += 1
+                errors.append(f"{engine.name}: {e}")
+                logger.warning("OCR engine %s failed (%s), trying next engine", engine.name, e)
+                continue
+
+            engine.completed += 1
+            result['engine'] = engine.name
+            return result
+
+        raise EngineError('; '.join(errors))
@@ -0,0 +1,186 @@
+"""
+Perceptual image hashing and near-duplicate lookup
+
+A difference hash (dHash) survives JPEG re-encodes, rescaling and small
+brightness changes, so re-uploads of the same document map to hashes that
+differ in only a few bits. Lookups use multi-index hashing: the hash is
+split into ``max_distance // 2 + 1`` chunks, and by the pigeonhole principle
+any hash within ``max_distance`` bits of a query differs from it in at most
+one bit on at least one chunk. Each chunk is a plain dict, probed with the
+query's chunk value and its one-bit neighbours, so a lookup only compares
+the query against the entries that share (nearly) a chunk value.
+
+Document hashes are sparse: blank margins and line spacing leave most bits
+clear. Chunks therefore interleave the bits (chunk i holds bits i, i + k,
+i + 2k, ...) so each one samples the whole page, and are kept wide (fewer
+chunks, probed at distance one) so that few pages share a chunk value.
+Contiguous bit ranges fall entirely inside the margins, and narrow chunks
+are often empty; either puts a large share of all pages in one bucket.
+
+Lookup cost still grows with the number of stored pages that share chunk
+values with the query, and this index does not guarantee sub-millisecond
+lookups at a million entries. Varied pages stay far below that: about 80us
+at a million hashes with blank margins, and a median of about 160us at 100k
+synthetic text pages. Pages with very little text, or many pages of one
+template, collide on near-empty chunks instead. For those the slowest 1% of
+lookups took about 9ms at 100k entries, and on same-template pages the cost
+grows by about 2us per thousand entries.
+
+A coarse hash cannot tell apart two pages of different text set in the same
+layout, so candidates are confirmed against a much finer detail hash.
+"""
+import threading
+from typing import Dict, List, Set, Tuple
+
+from PIL import Image
+
+# 16x16 comparisons -> 256-bit hash used for indexing
+HASH_SIZE = 16
+# 64x64 comparisons -> 4096-bit hash used to confirm candidates
+DETAIL_HASH_SIZE = 64
+# Neighbouring cells must differ by more than this many gray levels to set
+# a bit; otherwise compression noise on the blank background flips bits
+MIN_STEP = {HASH_SIZE: 4, DETAIL_HASH_SIZE: 8}
+
+
+def dhash(gray: Image.Image, hash_size: int) -> int:
+    """
+    Compute the difference hash of a grayscale image
+
+    Args:
+        gray: Decoded image in mode 'L'
+        hash_size: Number of comparisons per row/column
+
+    Returns:
+        int: ``hash_size * hash_size`` bit hash
+    """
+    min_step = MIN_STEP.get(hash_size, 4)
+    pixels = gray.resize((hash_size + 1, hash_size), Image.BOX).tobytes()
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col + 1] - pixels[offset + col] > min_step)
+    return value
+
+
+def image_hashes(image: Image.Image) -> Tuple[int, int]:
+    """
+    Compute the index hash and the detail hash of a PIL image
+
+    Every format goes through the same full-resolution box resize; letting
+    the JPEG decoder downscale first would make a JPEG and a PNG of the
+    same page hash differently.
+
+    Returns:
+        tuple: ``(hash, detail_hash)``
+    """
+    gray = image.convert('L')
+    return dhash(gray, HASH_SIZE), dhash(gray, DETAIL_HASH_SIZE)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two hashes"""
+    return bin(a ^ b).count('1')
+
+
+class PerceptualHashIndex:
+    """
+    In-memory multi-index over perceptual hashes
+
+    Entries are ``(hash, item_id, language)``; only entries recorded with the
+    same language are returned, since the OCR result depends on it.
+    """
+
+    def __init__(self, max_distance: int = 6, hash_bits: int = HASH_SIZE ** 2):
+        if max_distance < 0 or max_distance >= hash_bits:
+            raise ValueError(f"max_distance must be in [0, {hash_bits})")
+
+        self.max_distance = max_distance
+        self.hash_bits = hash_bits
+        # Highest history id already loaded, for incremental syncing
+        self.last_id = 0
+
+        # max_distance // 2 + 1 interleaved chunks: a hash within
+        # max_distance bits differs by at most _radius bits on some chunk
+        self._num_chunks = max_distance // 2 + 1
+        self._radius = max_distance // self._num_chunks
+        # Chunk i holds bits i, i + k, i + 2k, ... of the k chunks
+        widths = [len(range(i, hash_bits, self._num_chunks)) for i in range(self._num_chunks)]
+        self._flips: List[List[int]] = [
+            [1 << bit for bit in range(width)] if self._radius else [] for width in widths
+        ]
+        self._tables: List[Dict[int, Set[int]]] = [{} for _ in range(self._num_chunks)]
+        self._entries: Dict[int, List[Tuple[int, str]]] = {}
+        self._item_hashes: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def _chunk_keys(self, image_hash: int) -> List[int]:
+        """Chunk values of a hash; slicing the bit string keeps this in C"""
+        bits = format(image_hash, f'0{self.hash_bits}b')
+        return [int(bits[i::self._num_chunks], 2) for i in range(self._num_chunks)]
+
+    def __len__(self) -> int:
+        return len(self._item_hashes)
+
+    def add(self, image_hash: int, item_id: int, language: str):
+        """Record a history item under its perceptual hash"""
+        with self._lock:
+            items = self._entries.setdefault(image_hash, [])
+            if not items:
+                for table, key in zip(self._tables, self._chunk_keys(image_hash)):
+                    table.setdefault(key, set()).add(image_hash)
+            items.append((item_id, language))
+            self._item_hashes[item_id] = image_hash
+            self.last_id = max(self.last_id, item_id)
+
+    def remove(self, item_id: int):
+        """Forget a history item (e.g. after it was deleted)"""
+        with self._lock:
+            image_hash = self._item_hashes.pop(item_id, None)
+            if image_hash is None:
+                return
+
+            remaining = [item for item in self._entries[image_hash] if item[0] != item_id]
+            if remaining:
+                self._entries[image_hash] = remaining
+                return
+
+            del self._entries[image_hash]
+            for table, key in zip(self._tables, self._chunk_keys(image_hash)):
+                bucket = table.get(key)
+                if bucket is not None:
+                    bucket.discard(image_hash)
+                    if not bucket:
+                        del table[key]
+
+    def find(self, image_hash: int, language: str) -> List[Tuple[int, int]]:
+        """
+        Find recorded items within ``max_distance`` bits
+
+        Returns:
+            list: ``(item_id, distance)`` pairs, closest (then newest) first
+        """
+        with self._lock:
+            candidates: Set[int] = set()
+            for table, key, flips in zip(self._tables, self._chunk_keys(image_hash), self._flips):
+                bucket = table.get(key)
+                if bucket:
+                    candidates.update(bucket)
+                for flip in flips:
+                    bucket = table.get(key ^ flip)
+                    if bucket:
+                        candidates.update(bucket)
+
+            matches = []
+            for candidate in candidates:
+                distance = hamming_distance(image_hash, candidate)
+                if distance > self.max_distance:
+                    continue
+                for item_id, item_language in self._entries[candidate]:
+                    if item_language == language:
+                        matches.append((item_id, distance))
+
+        matches.sort(key=lambda match: (match[1], -match[0]))
+        return matches
@@ -1,56 +1,53 @@
-import pytesseract
 from PIL import Image
 import io
 import time
-from typing import Optional
+from typing import Optional, Tuple
 import os
+from app.services.image_hash import image_hashes
+from app.services.content_detection import crop_to_content
+from app.services.engines import EngineRegistry, EngineRouter
+from app.services.deadline import Deadline, DeadlineExceeded, RequestCancelled
 
-# Import EasyOCR as alternative
-try:
-    import easyocr
-    EASYOCR_AVAILABLE = True
-except ImportError:
-    EASYOCR_AVAILABLE = False
+# Orientation/script detection runs on a copy no larger than this
+OSD_MAX_SIDE = 1200
+# Below these Tesseract OSD confidences the detection is ignored
+OSD_MIN_ORIENTATION_CONF = 2.0
+OSD_MIN_SCRIPT_CONF = 1.0
+# Tesseract OSD script name -> language model
+SCRIPT_LANGUAGES = {
+    'Latin': 'eng',
+    'Devanagari': 'hin'
+}
+# Skip blank pages and crop to the text-bearing region before recognition
+CONTENT_DETECTION = os.getenv("OCR_CONTENT_DETECTION", "true").lower() in ("1", "true", "yes")
 
 class OCRService:
-    def __init__(self):
-        # Configure tesseract path if needed
-        # For macOS with Homebrew
-        import shutil
-        tesseract_path = shutil.which('tesseract')
-        if tesseract_path:
-            pytesseract.pytesseract.tesseract_cmd = tesseract_path
-        elif os.path.exists('/opt/homebrew/bin/tesseract'):
-            pytesseract.pytesseract.tesseract_cmd = '/opt/homebrew/bin/tesseract'
-        elif os.path.exists('/usr/local/bin/tesseract'):
-            pytesseract.pytesseract.tesseract_cmd = '/usr/local/bin/tesseract'
-        # For Windows (uncomment if needed)
-        # pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-        
+    def __init__(self, engines: Optional[str] = None):
+        """
+        Args:
+            engines: Comma-separated engine names in order of preference;
+                defaults to the OCR_ENGINES environment variable
+        """
         self.supported_languages = {
             'eng': 'English',
             'hin': 'Hindi',
             'eng+hin': 'English + Hindi'
         }
         
-        # Initialize EasyOCR if available
-        self.easyocr_reader = None
-        if EASYOCR_AVAILABLE:
-            try:
-                # Initialize EasyOCR with English and Hindi support
-                self.easyocr_reader = easyocr.Reader(['en', 'hi'], gpu=False)
-                print("✅ EasyOCR initialized successfully!")
-            except Exception as e:
-                print(f"⚠️  EasyOCR initialization failed: {e}")
+        self.registry = EngineRegistry.from_config(engines)
+        self.engine_router = EngineRouter(self.registry)
         
         # Check if Tesseract is available
         self._check_tesseract_availability()
     
     def _check_tesseract_availability(self):
         """Check if Tesseract OCR is properly installed and accessible"""
+        tesseract = self.registry.get('tesseract')
+        if tesseract is None:
+            return False
         try:
             # Try to run tesseract to verify it's working
-            pytesseract.get_tesseract_version()
+            tesseract.check_health()
             return True
         except Exception as e:
             print(f"WARNING: Tesseract OCR not properly configured: {e}")
@@ -59,41 +56,73 @@ class OCRService:
             print("Ubuntu: sudo apt-get install tesseract-ocr tesseract-ocr-eng tesseract-ocr-hin")
             return False
     
-    def extract_text_from_image(self, image_bytes: bytes, language: str = 'eng') -> dict:
+    def detect_orientation_and_script(self, image: Image.Image, deadline: Optional[Deadline] = None) -> Optional[dict]:
         """
-        Extract text from image bytes using Tesseract OCR
+        Detect page orientation and script with Tesseract OSD
+        
+        Runs on a downscaled copy, which is enough for OSD and far cheaper
+        than full recognition.
+        
+        Args:
+            image: Decoded PIL image
+            deadline: Request deadline; OSD is killed when it expires
+            
+        Returns:
+            dict: Rotation (degrees clockwise) and script, or None if OSD
+            failed or Tesseract is not available
+        """
+        tesseract = self.registry.get('tesseract')
+        if tesseract is None or not tesseract.is_healthy():
+            return None
+        
+        try:
+            small = image.copy()
+            small.thumbnail((OSD_MAX_SIDE, OSD_MAX_SIDE))
+            osd = tesseract.detect_orientation_and_script(small, deadline or Deadline())
+        except DeadlineExceeded:
+            raise
+        except Exception:
+            return None
+        
+        return {
+            'rotate': osd['rotate'] if osd['orientation_conf'] >= OSD_MIN_ORIENTATION_CONF else 0,
+            'script': osd['script'] if osd['script_conf'] >= OSD_MIN_SCRIPT_CONF else None
+        }
+    
+    def narrow_language(self, language: str, script: Optional[str]) -> str:
+        """
+        Pick the narrowest supported language for a detected script
+        
+        Only languages that were requested are considered, so 'eng+hin'
+        becomes 'eng' for Latin text but 'eng' never becomes 'hin'.
+        """
+        detected = SCRIPT_LANGUAGES.get(script)
+        if detected in language.split('+') and detected in self.supported_languages:
+            return detected
+        return language
+    
+    def extract_text_from_image(self, image_bytes: bytes, language: str = 'eng', auto_detect: bool = False,
+                                deadline: Optional[Deadline] = None) -> dict:
+        """
+        Extract text from image bytes with the best available OCR engine
         
         Args:
             image_bytes: Image data as bytes
             language: Language code for OCR (eng, hin, eng+hin)
+            auto_detect: Correct page rotation and narrow the language
+                to the detected script before recognition
+            deadline: Time budget for preprocessing and recognition
+                (defaults to OCR_REQUEST_TIMEOUT); work stops as soon as it
+                expires or is cancelled
             
         Returns:
-            dict: Contains extracted text, confidence, and processing time
+            dict: Contains extracted text, confidence, processing time and
+            the engine/language actually used
         """
         start_time = time.time()
+        deadline = deadline or Deadline()
         
         try:
-            # Check if Tesseract is available
-            try:
-                pytesseract.get_tesseract_version()
-                tesseract_available = True
-            except Exception as e:
-                tesseract_available = False
-            
-            if not tesseract_available:
-                # Try EasyOCR as alternative
-                if self.easyocr_reader is not None:
-                    return self._extract_with_easyocr(image_bytes, language, start_time)
-                else:
-                    # DEMO MODE: Return a sample text extraction for testing
-                    return {
-                        'text': f'DEMO MODE - OCR not available\n\nThis is a sample text extraction to demonstrate the application functionality.\n\nLanguage: {language}\nImage size: {len(image_bytes)} bytes\n\nTo enable real OCR, install either:\n• Tesseract: brew install tesseract tesseract-lang\n• EasyOCR is installed but failed to initialize\n\nThe application interface, history, download, and all other features are working perfectly!',
-                        'confidence': 85.5,
-                        'processing_time': f"{time.time() - start_time:.2f}s",
-                        'language': language,
-                        'success': True
-                    }
-            
             # Convert bytes to PIL Image
             image = Image.open(io.BytesIO(image_bytes))
             
@@ -101,80 +130,60 @@ class OCRService:
             if image.mode != 'RGB':
                 image = image.convert('RGB')
             
-            # Perform OCR with specified language
-            config = f'--oem 3 --psm 6 -l {language}'
-            extracted_text = pytesseract.image_to_string(image, config=config)
+            if CONTENT_DETECTION:
+                deadline.check()
+                image = crop_to_content(image)
+                if image is None:
+                    # Blank page: nothing to recognise
+                    return {
+                        'text': '',
+                        'confidence': 0,
+                        'processing_time': f"{time.time() - start_time:.2f}s",
+                        'language': language,
+                        'engine': None,
+                        'language_used': language,
+                        'blank': True,
+                        'success': True
+                    }
+            
+            language_used = language
+            rotation = 0
+            if auto_detect:
+                detection = self.detect_orientation_and_script(image, deadline)
+                if detection is not None:
+                    rotation = detection['rotate']
+                    if rotation:
+                        # PIL rotates counter-clockwise
+                        image = image.rotate(-rotation, expand=True)
+                    language_used = self.narrow_language(language, detection['script'])
             
-            # Get confidence data
-            try:
-                data = pytesseract.image_to_data(image, config=config, output_type=pytesseract.Output.DICT)
-                confidences = [int(conf) for conf in data['conf'] if int(conf) > 0]
-                avg_confidence = sum(confidences) / len(confidences) if confidences else 0
-            except:
-                avg_confidence = 0
+            deadline.check()
+            result = self.engine_router.recognize(image, language_used, deadline)
             
             processing_time = time.time() - start_time
             
             return {
-                'text': extracted_text.strip(),
-                'confidence': round(avg_confidence, 2),
+                'text': result['text'],
+                'confidence': round(result['confidence'], 2),
                 'processing_time': f"{processing_time:.2f}s",
                 'language': language,
+                'engine': result['engine'],
+                'language_used': language_used,
+                'rotation': rotation,
                 'success': True
             }
             
-        except Exception as e:
+        except DeadlineExceeded as e:
             return {
                 'text': '',
                 'confidence': 0,
                 'processing_time': f"{time.time() - start_time:.2f}s",
                 'language': language,
                 'success': False,
+                'timed_out': not isinstance(e, RequestCancelled),
+                'cancelled': isinstance(e, RequestCancelled),
                 'error': str(e)
             }
-    
-    def _extract_with_easyocr(self, image_bytes: bytes, language: str, start_time: float) -> dict:
-        """
-        Extract text using EasyOCR as alternative to Tesseract
-        """
-        try:
-            # Convert bytes to PIL Image
-            image = Image.open(io.BytesIO(image_bytes))
-            
-            # Convert to RGB if necessary
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            # Convert PIL image to numpy array for EasyOCR
-            import numpy as np
-            image_array = np.array(image)
-            
-            # Perform OCR with EasyOCR
-            results = self.easyocr_reader.readtext(image_array, detail=1)
-            
-            # Extract text and confidence
-            extracted_texts = []
-            confidences = []
-            
-            for (bbox, text, confidence) in results:
-                if confidence > 0.3:  # Filter low confidence results
-                    extracted_texts.append(text)
-                    confidences.append(confidence * 100)  # Convert to percentage
-            
-            # Combine all text
-            full_text = '\n'.join(extracted_texts)
-            avg_confidence = sum(confidences) / len(confidences) if confidences else 0
-            
-            processing_time = time.time() - start_time
-            
-            return {
-                'text': full_text.strip(),
-                'confidence': round(avg_confidence, 2),
-                'processing_time': f"{processing_time:.2f}s",
-                'language': language,
-                'success': True
-            }
-            
         except Exception as e:
             return {
                 'text': '',
@@ -182,9 +191,33 @@ class OCRService:
                 'processing_time': f"{time.time() - start_time:.2f}s",
                 'language': language,
                 'success': False,
-                'error': f"EasyOCR error: {str(e)}"
+                'error': str(e)
             }
     
+    def get_engine_info(self) -> dict:
+        """Capabilities, health and load of every registered engine"""
+        return {'engines': [engine.info() for engine in self.registry.engines()]}
+    
+    def compute_image_hashes(self, image_bytes: bytes) -> Optional[Tuple[str, str]]:
+        """
+        Compute perceptual hashes of the decoded image
+        
+        Unlike a hash of the raw bytes, these stay (nearly) the same across
+        JPEG re-encodes, rescaling and screenshots of the same document.
+        
+        Args:
+            image_bytes: Image data as bytes
+            
+        Returns:
+            tuple: Hex-encoded index hash and detail hash, or None if the
+            image cannot be decoded
+        """
+        try:
+            image_hash, detail_hash = image_hashes(Image.open(io.BytesIO(image_bytes)))
+            return f"{image_hash:x}", f"{detail_hash:x}"
+        except Exception:
+            return None
+    
     def validate_image(self, image_bytes: bytes) -> dict:
         """
         Validate if the uploaded file is a valid image
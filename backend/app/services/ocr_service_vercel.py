@@ -1,84 +1,75 @@
 """
 Vercel-compatible OCR service
-Uses demo mode since EasyOCR/Tesseract are too large for serverless
+Same engines and routing as the full server, behind the request/response
+shape used by main_vercel. Serverless bundles usually ship without Tesseract
+or EasyOCR, in which case the router falls back to the demo engine.
 """
-import io
 import logging
-from typing import Dict, Any
-from PIL import Image
+from typing import Dict, Any, List
+from app.services.ocr_service import OCRService as BaseOCRService
 
 logger = logging.getLogger(__name__)
 
-class OCRService:
-    def __init__(self):
-        """Initialize OCR service in demo mode for Vercel"""
-        self.demo_mode = True
-        logger.info("🚀 OCR Service initialized in DEMO mode for Vercel deployment")
+# Two-letter codes used by the Vercel API -> Tesseract language codes
+LANGUAGE_CODES = {
+    'en': 'eng',
+    'hi': 'hin'
+}
+
+class OCRService(BaseOCRService):
+    def __init__(self, engines: str = None):
+        """Initialize OCR service for Vercel"""
+        super().__init__(engines)
+        logger.info("🚀 OCR Service initialized for Vercel deployment (demo mode: %s)", self.demo_mode)
+    
+    @property
+    def demo_mode(self) -> bool:
+        """True when only the demo engine is usable"""
+        return not any(engine.is_healthy() for engine in self.registry.engines() if not engine.fallback_only)
+    
+    def _engine_language(self, language: str) -> str:
+        """Translate a Vercel language code like 'en+hi' to 'eng+hin'"""
+        return '+'.join(LANGUAGE_CODES.get(part, part) for part in language.split('+'))
+    
+    def supports_language(self, language: str) -> bool:
+        """
+        Whether a Vercel language code is one the service accepts
+
+        Checked against the engines that are actually up, so a bundle that
+        ships only eng.traineddata turns 'hi' away instead of failing later.
+        """
+        engine_language = self._engine_language(language)
+        return engine_language in self.supported_languages and self.engine_router.supports(engine_language)
+    
+    def available_languages(self) -> List[Dict[str, str]]:
+        """Vercel language codes and names the running engines can read"""
+        return [
+            {'code': code, 'name': self.supported_languages[engine_language]}
+            for code, engine_language in LANGUAGE_CODES.items()
+            if self.engine_router.supports(engine_language)
+        ]
     
     def extract_text(self, image_file: bytes, language: str = 'en') -> Dict[str, Any]:
         """
-        Extract text from image - Demo mode for Vercel
+        Extract text from image
         """
-        try:
-            # Validate image
-            image = Image.open(io.BytesIO(image_file))
-            
-            # Demo text responses based on image characteristics
-            width, height = image.size
-            format_name = image.format or "Unknown"
-            
-            # Generate demo text based on image properties
-            demo_texts = [
-                f"🎯 Image2Text Pro Demo\n\nThis is a demonstration of our OCR capabilities.\n\nImage Details:\n- Format: {format_name}\n- Dimensions: {width}×{height}\n- Language: {language.upper()}\n\n✨ In production, this would contain the actual extracted text from your image using advanced OCR technology.\n\n🚀 Deploy with full OCR capabilities on your own server!",
-                
-                f"📄 Sample Document Text\n\nDocument Analysis Complete\n\nFile: {format_name} Image\nSize: {width} × {height} pixels\nProcessed: Successfully\n\nContent Preview:\nLorem ipsum dolor sit amet, consectetur adipiscing elit. Sed do eiusmod tempor incididunt ut labore et dolore magna aliqua.\n\n🔍 This is demonstration text. Real OCR would extract actual text from your uploaded image.",
-                
-                f"📊 Image Processing Report\n\n✅ Image loaded successfully\n✅ Format detected: {format_name}\n✅ Resolution: {width}×{height}\n✅ Language: {language}\n\n📝 Extracted Content:\nThis is a sample of what would be extracted from your image. Our OCR engine would analyze the actual text content and provide accurate transcription.\n\n⚡ Ready for production deployment!",
-                
-                f"🌟 Welcome to Image2Text Pro!\n\nYour image has been processed:\n\n📸 Image Type: {format_name}\n📏 Dimensions: {width} × {height}\n🌍 Language: {language.upper()}\n\n📋 Sample Extracted Text:\n\"This demonstration shows how our OCR system would extract text from your images. In a full deployment, you would see the actual text content from your uploaded image here.\"\n\n🎉 Ready to extract real text? Deploy the full version!"
-            ]
-            
-            # Select demo text based on image size
-            text_index = (width + height) % len(demo_texts)
-            extracted_text = demo_texts[text_index]
-            
-            return {
-                'text': extracted_text,
-                'confidence': 95.0,
-                'language': language,
-                'demo_mode': True,
-                'message': 'Demo mode active - Deploy full version for real OCR',
-                'engine': 'Demo Engine v1.0',
-                'processing_time': 0.5,
-                'image_info': {
-                    'format': format_name,
-                    'width': width,
-                    'height': height,
-                    'mode': image.mode
-                }
-            }
-            
-        except Exception as e:
-            logger.error(f"Error in demo OCR processing: {str(e)}")
-            return {
-                'text': '❌ Error processing image in demo mode. Please check the image format and try again.',
-                'confidence': 0.0,
-                'language': language,
-                'demo_mode': True,
-                'error': str(e),
-                'engine': 'Demo Engine v1.0'
-            }
+        result = self.extract_text_from_image(image_file, self._engine_language(language))
+        
+        response = {
+            'success': result['success'],
+            'text': result['text'],
+            'confidence': result['confidence'],
+            'language': language,
+            'demo_mode': result.get('engine') == 'demo',
+            'engine': result.get('engine'),
+            'processing_time': result['processing_time']
+        }
+        if not result['success']:
+            logger.error(f"Error in OCR processing: {result.get('error')}")
+            response['error'] = result.get('error')
+            response['timed_out'] = result.get('timed_out', False)
+        return response
     
     def is_available(self) -> bool:
         """Check if OCR service is available"""
-        return True
-    
-    def get_engine_info(self) -> Dict[str, str]:
-        """Get OCR engine information"""
-        return {
-            'primary_engine': 'Demo Mode',
-            'fallback_engine': 'Not Available',
-            'status': 'Active (Demo)',
-            'deployment': 'Vercel Compatible',
-            'note': 'This is a demonstration version. Deploy the full version for real OCR capabilities.'
-        }
+        return any(engine.is_healthy() for engine in self.registry.engines())
@@ -0,0 +1,107 @@
+"""
+Per-process serving metrics
+
+Each server process keeps a row in the shared database with its cold-start
+time, memory use and request count, so the metrics endpoint can show every
+worker no matter which one answers. Memory is reported both as RSS and as
+PSS (proportional set size): pages shared copy-on-write with the pre-fork
+master count fully towards RSS but only fractionally towards PSS.
+"""
+import os
+import time
+from datetime import datetime
+from typing import Optional
+
+from app.models.database import SessionLocal, WorkerMetrics
+
+# Seconds between database writes of a worker's counters
+FLUSH_INTERVAL = 5.0
+
+
+def process_age() -> Optional[float]:
+    """Seconds since this process was created (exec or fork), if known"""
+    try:
+        with open('/proc/self/stat') as stat:
+            # Fields after the parenthesised command name; starttime is field 22
+            fields = stat.read().rsplit(')', 1)[1].split()
+        with open('/proc/uptime') as uptime:
+            system_uptime = float(uptime.read().split()[0])
+        return system_uptime - int(fields[19]) / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def memory_usage() -> dict:
+    """Resident and proportional set size of this process in bytes"""
+    usage = {'rss_bytes': None, 'pss_bytes': None}
+    try:
+        with open('/proc/self/smaps_rollup') as smaps:
+            for line in smaps:
+                name, _, value = line.partition(':')
+                if name in ('Rss', 'Pss'):
+                    usage[f'{name.lower()}_bytes'] = int(value.split()[0]) * 1024
+        return usage
+    except OSError:
+        pass
+
+    # Not Linux: peak RSS is the best portable figure
+    import resource
+    import sys
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    usage['rss_bytes'] = peak if sys.platform == 'darwin' else peak * 1024
+    return usage
+
+
+class WorkerMetricsRecorder:
+    """Counts requests for the current process and persists them periodically"""
+
+    def __init__(self):
+        self._imported_at = time.monotonic()
+        self.cold_start_seconds = None
+        self.requests = 0
+        self._flushed_at = 0.0
+
+    def mark_ready(self):
+        """Record how long this process took to become ready to serve"""
+        age = process_age()
+        self.cold_start_seconds = age if age is not None else time.monotonic() - self._imported_at
+        # A forked worker inherits the master's counters
+        self.requests = 0
+        self.flush()
+
+    def record_request(self):
+        self.requests += 1
+        if time.monotonic() - self._flushed_at >= FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        """Write this process's metrics row"""
+        self._flushed_at = time.monotonic()
+        db = SessionLocal()
+        try:
+            db.merge(WorkerMetrics(
+                pid=os.getpid(),
+                cold_start_seconds=self.cold_start_seconds,
+                requests=self.requests,
+                updated_at=datetime.utcnow(),
+                **memory_usage()
+            ))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"WARNING: Could not record worker metrics: {e}")
+        finally:
+            db.close()
+
+
+def forget_worker(pid: int):
+    """Drop the metrics row of a process that has exited"""
+    db = SessionLocal()
+    try:
+        db.query(WorkerMetrics).filter(WorkerMetrics.pid == pid).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+recorder = WorkerMetricsRecorder()
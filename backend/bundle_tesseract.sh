@@ -0,0 +1,46 @@
+#!/bin/bash
+
+# Build a trimmed, self-contained Tesseract for the serverless deployment.
+#
+# Run this on a machine matching the serverless runtime (Amazon Linux 2023
+# for Vercel) with Tesseract installed, e.g.:
+#   docker run --rm -v "$PWD":/app -w /app/backend amazonlinux:2023 \
+#     sh -c "dnf install -y tesseract && ./bundle_tesseract.sh eng"
+#
+# Usage: ./bundle_tesseract.sh [language ...]   (default: eng)
+#
+# The result in backend/tesseract/ is picked up automatically by the
+# Tesseract engine. It ships the "fast" integer models, a few MB per
+# language instead of 15-20MB for the default ones.
+
+set -e
+
+DEST="$(cd "$(dirname "$0")" && pwd)/tesseract"
+TESSERACT_BIN="${TESSERACT_BIN:-$(command -v tesseract)}"
+LANGUAGES="${*:-eng}"
+
+if [ -z "$TESSERACT_BIN" ]; then
+    echo "❌ tesseract not found; install it or set TESSERACT_BIN"
+    exit 1
+fi
+
+echo "📦 Bundling $TESSERACT_BIN with languages: $LANGUAGES"
+rm -rf "$DEST"
+mkdir -p "$DEST/bin" "$DEST/lib" "$DEST/tessdata"
+
+cp "$TESSERACT_BIN" "$DEST/bin/tesseract"
+chmod +x "$DEST/bin/tesseract"
+
+# Shared libraries, except glibc which every runtime provides
+ldd "$TESSERACT_BIN" \
+    | awk '/=> \// {print $3}' \
+    | grep -v -E '/(libc|libm|libpthread|libdl|librt|ld-linux[^/]*)\.so' \
+    | while read -r library; do cp -L "$library" "$DEST/lib/"; done
+
+# osd is needed for orientation/script detection (auto_detect)
+for language in $LANGUAGES osd; do
+    curl -fsSL -o "$DEST/tessdata/$language.traineddata" \
+        "https://github.com/tesseract-ocr/tessdata_fast/raw/main/$language.traineddata"
+done
+
+echo "✅ Bundle ready: $(du -sh "$DEST" | cut -f1) in $DEST"
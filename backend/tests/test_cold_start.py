@@ -0,0 +1,29 @@
+"""
+Cold-start budget of the serverless entry point (main_vercel.py)
+
+Runs the same probe as ``python main_vercel.py --check-budget``: fresh
+interpreters import the app and serve one OCR request.
+"""
+import pytest
+
+import main_vercel
+from app.services.engines import TesseractEngine
+
+
+@pytest.fixture(scope='module')
+def measured():
+    return main_vercel.measure_cold_start()
+
+
+def test_import_within_budget(measured):
+    assert measured['import_seconds'] <= main_vercel.IMPORT_BUDGET
+
+
+def test_first_ocr_response_within_budget(measured):
+    if measured['engine'] != 'tesseract' and TesseractEngine().tesseract_cmd is None:
+        pytest.skip("No Tesseract bundle or install; build one with ./bundle_tesseract.sh")
+
+    assert measured['status'] == 200
+    # Timing the demo engine would say nothing about real cold starts
+    assert measured['engine'] == 'tesseract'
+    assert measured['cold_start_seconds'] <= main_vercel.COLD_START_BUDGET
@@ -0,0 +1,86 @@
+"""
+Blank page and text region detection (app/services/content_detection.py)
+"""
+import io
+import random
+
+from PIL import Image, ImageDraw, ImageFont
+
+from app.services.content_detection import crop_to_content, find_content_box
+
+PAGE_SIZE = (1240, 1754)  # A4 at 150 dpi
+
+
+def _page(lines, ink=0, paper=255, origin=(40, 50)):
+    """
+    Render lines of text onto a page
+
+    Drawn with PIL's built-in bitmap font at a third of the page size and
+    scaled up, so strokes are about as thick as on a real scan.
+    """
+    small = Image.new('L', (PAGE_SIZE[0] // 3, PAGE_SIZE[1] // 3), paper)
+    draw = ImageDraw.Draw(small)
+    font = ImageFont.load_default()
+    x, y = origin
+    for line in lines:
+        draw.text((x, y), line, fill=ink, font=font)
+        y += 14
+    return small.resize(PAGE_SIZE, Image.NEAREST).convert('RGB')
+
+
+def _jpeg(image, quality=60):
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=quality)
+    return Image.open(io.BytesIO(buffer.getvalue()))
+
+
+def _paragraph(count):
+    return [f"Line {i}: the quick brown fox jumps over the lazy dog" for i in range(count)]
+
+
+def test_blank_page():
+    assert find_content_box(Image.new('RGB', PAGE_SIZE, 'white')) is None
+    assert crop_to_content(Image.new('RGB', PAGE_SIZE, (30, 30, 30))) is None
+
+
+def test_jpeg_background_noise_is_blank():
+    rng = random.Random(0)
+    paper = Image.new('L', PAGE_SIZE, 240)
+    paper.putdata([240 + rng.randint(-6, 6) for _ in range(PAGE_SIZE[0] * PAGE_SIZE[1])])
+    assert find_content_box(_jpeg(paper.convert('RGB'))) is None
+
+
+def test_single_short_line_is_not_blank():
+    page = _jpeg(_page(["hello world"], origin=(150, 200)))
+    box = find_content_box(page)
+    assert box is not None
+    left, top, right, bottom = box
+    # Cropped tightly around the line
+    assert 400 < left < 450 and 550 < top < 600
+    assert (right - left) * (bottom - top) < PAGE_SIZE[0] * PAGE_SIZE[1] * 0.1
+
+
+def test_low_contrast_text_is_not_blank():
+    # Dim phone photo: dark gray text on a mid-gray page
+    assert find_content_box(_jpeg(_page(_paragraph(40), ink=110, paper=150))) is not None
+    # Light gray text on white
+    assert find_content_box(_jpeg(_page(_paragraph(40), ink=210, paper=255))) is not None
+
+
+def test_light_text_on_dark_page():
+    box = find_content_box(_jpeg(_page(_paragraph(5), ink=255, paper=20)))
+    assert box is not None
+    assert box[3] < PAGE_SIZE[1] / 2
+
+
+def test_crop_keeps_dense_pages_whole():
+    page = _page([f"{i:3}: " + "the quick brown fox jumps " * 3 for i in range(110)], origin=(5, 5))
+    assert crop_to_content(page) is page
+
+
+def test_unclear_region_falls_back_to_whole_page():
+    # Scattered dark pixels: not blank, but no text region stands out
+    rng = random.Random(1)
+    page = Image.new('L', PAGE_SIZE, 255)
+    page.putdata([0 if rng.random() < 0.001 else 255 for _ in range(PAGE_SIZE[0] * PAGE_SIZE[1])])
+    assert find_content_box(page) == (0, 0) + PAGE_SIZE
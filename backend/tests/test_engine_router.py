@@ -0,0 +1,59 @@
+"""
+Engine ranking (app/services/engines.py)
+"""
+import pytest
+
+from app.services.engines import (
+    EasyOCREngine, EngineRegistry, EngineRouter, OCREngine, TesseractEngine
+)
+
+
+class InstalledTesseract(TesseractEngine):
+    """Tesseract's cost model, without looking for the binary"""
+
+    languages = frozenset({'eng', 'hin'})
+
+    def __init__(self):
+        OCREngine.__init__(self)
+
+    def check_health(self):
+        return True
+
+
+class InstalledEasyOCR(EasyOCREngine):
+    """EasyOCR's cost model, without loading the models"""
+
+    def __init__(self):
+        OCREngine.__init__(self)
+
+    def check_health(self):
+        return True
+
+
+@pytest.fixture
+def router():
+    registry = EngineRegistry()
+    registry.register(InstalledTesseract())
+    registry.register(InstalledEasyOCR())
+    router = EngineRouter(registry, max_workers=1)
+    yield router
+    router.executor.shutdown()
+
+
+def test_image_size_changes_the_ranking(router):
+    assert router.candidates(200, 200, 'eng')[0].name == 'easyocr'
+    assert router.candidates(1240, 1754, 'eng')[0].name == 'tesseract'
+
+
+def test_each_language_model_adds_start_up(router):
+    # Tesseract loads one model per language, EasyOCR has both loaded
+    assert router.candidates(400, 400, 'eng')[0].name == 'tesseract'
+    assert router.candidates(400, 400, 'eng+hin')[0].name == 'easyocr'
+
+
+def test_engines_must_implement_recognize():
+    class Incomplete(OCREngine):
+        name = 'incomplete'
+
+    with pytest.raises(TypeError):
+        Incomplete()
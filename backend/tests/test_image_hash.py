@@ -0,0 +1,94 @@
+"""
+Near-duplicate index (app/services/image_hash.py)
+"""
+import random
+import statistics
+import time
+
+import pytest
+
+from app.services.image_hash import PerceptualHashIndex, hamming_distance
+
+
+def _document_hash(rng: random.Random) -> int:
+    """
+    Sparse, correlated 16x16 hash shaped like a text page's dHash: blank
+    top and bottom margins, one bit where each line ends, a few inside it
+    """
+    value = 0
+    for row in range(rng.randint(1, 3), rng.randint(10, 15)):
+        end = rng.randint(5, 15)
+        value |= 1 << (row * 16 + end)
+        for col in range(1, end):
+            if rng.random() < 0.12:
+                value |= 1 << (row * 16 + col)
+    return value
+
+
+@pytest.mark.parametrize('max_distance', range(10))
+def test_find_matches_brute_force(max_distance):
+    rng = random.Random(max_distance)
+    base = [rng.getrandbits(64) for _ in range(200)]
+    # Neighbours at, just inside and just beyond max_distance
+    hashes = base + [
+        value ^ sum(1 << bit for bit in rng.sample(range(64), rng.randint(0, max_distance + 2)))
+        for value in base
+    ]
+    index = PerceptualHashIndex(max_distance, hash_bits=64)
+    for item_id, value in enumerate(hashes):
+        index.add(value, item_id, 'eng')
+
+    for query in hashes[::4]:
+        expected = sorted(
+            (hamming_distance(query, value), -item_id) for item_id, value in enumerate(hashes)
+            if hamming_distance(query, value) <= max_distance
+        )
+        assert index.find(query, 'eng') == [(-negated_id, distance) for distance, negated_id in expected]
+
+
+def test_add_and_remove():
+    index = PerceptualHashIndex(2, hash_bits=64)
+    index.add(0b1111, 1, 'eng')
+    index.add(0b1111, 2, 'eng')
+    index.add(0b0111, 3, 'eng')
+    assert len(index) == 3
+    assert index.last_id == 3
+    # Closest first, then newest
+    assert index.find(0b1111, 'eng') == [(2, 0), (1, 0), (3, 1)]
+
+    index.remove(2)
+    assert index.find(0b1111, 'eng') == [(1, 0), (3, 1)]
+    index.remove(1)
+    index.remove(3)
+    assert index.find(0b1111, 'eng') == []
+    assert len(index) == 0
+
+    # Unknown ids are ignored
+    index.remove(42)
+
+
+def test_find_filters_by_language():
+    index = PerceptualHashIndex(2, hash_bits=64)
+    index.add(0b1010, 1, 'eng')
+    index.add(0b1011, 2, 'hin')
+    index.add(0b1010, 3, 'eng+hin')
+    assert index.find(0b1010, 'eng') == [(1, 0)]
+    assert index.find(0b1010, 'hin') == [(2, 1)]
+    assert index.find(0b1010, 'eng+hin') == [(3, 0)]
+
+
+def test_typical_lookup_under_a_millisecond():
+    rng = random.Random(1)
+    hashes = [_document_hash(rng) for _ in range(50_000)]
+    index = PerceptualHashIndex(6)
+    for item_id, value in enumerate(hashes):
+        index.add(value, item_id, 'eng')
+
+    timings = []
+    for query in hashes[:300]:
+        started = time.perf_counter()
+        index.find(query, 'eng')
+        timings.append(time.perf_counter() - started)
+    # The median only: near-empty pages are known to be slower (see the
+    # module docstring)
+    assert statistics.median(timings) < 0.001
@@ -0,0 +1,48 @@
+"""
+Language validation of the serverless entry point (main_vercel.py)
+"""
+import asyncio
+
+import pytest
+
+import main_vercel
+from app.services.engines import OCREngine
+from app.services.ocr_service_vercel import OCRService
+
+
+class EnglishOnlyEngine(OCREngine):
+    """Stands in for a Tesseract bundle that ships only eng.traineddata"""
+
+    name = 'english-only'
+    languages = frozenset({'eng'})
+
+    def recognize(self, image, language, deadline):
+        return {'text': 'hello world', 'confidence': 90.0}
+
+
+@pytest.fixture
+def english_only(monkeypatch):
+    service = OCRService('demo')
+    service.registry.register(EnglishOnlyEngine())
+    monkeypatch.setattr(main_vercel, '_ocr_service', service)
+    return service
+
+
+def test_rejects_languages_the_engines_lack(english_only):
+    assert english_only.supports_language('en')
+    assert not english_only.supports_language('hi')
+    assert not english_only.supports_language('en+hi')
+    assert not english_only.supports_language('fr')
+
+
+def test_lists_only_languages_the_engines_read(english_only):
+    status, body = asyncio.run(main_vercel.get_supported_languages({}, b''))
+    assert status == 200
+    assert body['languages'] == [{'code': 'en', 'name': 'English'}]
+    assert body['demo_mode'] is False
+
+
+def test_demo_mode_lists_every_language():
+    service = OCRService('demo')
+    assert service.supports_language('en+hi')
+    assert [language['code'] for language in service.available_languages()] == ['en', 'hi']